@@ -6,6 +6,7 @@ Generates CSV files compatible with Fusion 360's ImportSplineCSV script
 import numpy as np
 from pathlib import Path
 from cochlea_model import CochleaModel
+from cochlea_export import format_points_csv
 
 def export_for_fusion360_simple(output_dir='fusion360_import'):
     """Generate simple CSV files for Fusion 360 import."""
@@ -28,12 +29,8 @@ def export_for_fusion360_simple(output_dir='fusion360_import'):
     n_points = 100  # Fusion 360 works well with ~100 points
     indices = np.linspace(0, len(geometry['centerline'][0])-1, n_points, dtype=int)
     
-    with open(centerline_file, 'w') as f:
-        for i in indices:
-            x = geometry['centerline'][0, i]
-            y = geometry['centerline'][1, i]
-            z = geometry['centerline'][2, i]
-            f.write(f"{x:.6f},{y:.6f},{z:.6f}\n")
+    with open(centerline_file, 'w', buffering=1 << 20) as f:
+        f.write(format_points_csv(geometry['centerline'][:, indices].T))
     
     print(f"Saved: {centerline_file}")
     
@@ -42,12 +39,10 @@ def export_for_fusion360_simple(output_dir='fusion360_import'):
     cross_sections_file = Path(output_dir) / 'cochlea_cross_sections.csv'
     cross_sections = model.generate_cross_sections(geometry, num_sections=10)
     
-    with open(cross_sections_file, 'w') as f:
-        for i, section in enumerate(cross_sections):
-            if i > 0:
-                f.write('\n')  # Blank line between sections
-            for point in section['points']:
-                f.write(f"{point[0]:.6f},{point[1]:.6f},{point[2]:.6f}\n")
+    section_blocks = [format_points_csv(section['points']) for section in cross_sections]
+    
+    with open(cross_sections_file, 'w', buffering=1 << 20) as f:
+        f.write('\n'.join(section_blocks))  # Blank line between sections
     
     print(f"Saved: {cross_sections_file}")
     
@@ -5,8 +5,16 @@ Exports only full circle cross sections for easy import with Fusion 360 ImportSp
 
 import numpy as np
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 import json
 import shutil
+import sys
+
+
+def format_points_csv(points):
+    """Format an (N, 3) point array as 'x,y,z' CSV lines with 6 decimals."""
+    # One %-format over the flattened array keeps the per-row work in C
+    return ("%.6f,%.6f,%.6f\n" * len(points)) % tuple(np.ravel(points).tolist())
 
 
 class CochleaExporter:
@@ -16,16 +24,43 @@ class CochleaExporter:
         """Initialize exporter with a cochlea model."""
         self.model = model
         
-    def export_all(self, export_dir='cochlea_output', replace_existing=True):
+    def export_all(self, export_dir='cochlea_output', replace_existing=True,
+                   centerline_mode=None, num_cross_sections=None, parallel=False):
         """
         Export centerline and full circle cross sections.
         
+        If neither centerline_mode nor num_cross_sections is given and stdin
+        is a terminal, both are asked for interactively.
+        
         Args:
             export_dir: Directory for exported files
             replace_existing: If True, remove existing directory before export
+            centerline_mode: '3D' or '2D' (default '3D')
+            num_cross_sections: Number of cross sections, 2-20 (default 5)
+            parallel: If True, write the CSV and JSON outputs concurrently
         """
+        if centerline_mode is None and num_cross_sections is None and sys.stdin.isatty():
+            centerline_mode, num_cross_sections = self.prompt_export_options()
+        
+        if centerline_mode is None:
+            centerline_mode = '3D'
+        if num_cross_sections is None:
+            num_cross_sections = 5
+        
+        if centerline_mode not in ('3D', '2D'):
+            raise ValueError("Centerline mode must be '3D' or '2D'")
+        if not 2 <= num_cross_sections <= 20:
+            raise ValueError("Number of cross sections must be between 2 and 20")
+        
         export_path = Path(export_dir)
         
+        # Keep an existing export that already matches this request
+        if not replace_existing:
+            results = self._existing_results(export_path, centerline_mode, num_cross_sections)
+            if results is not None:
+                print(f"\nExisting export in {export_path} is up to date, skipping")
+                return results
+        
         # Handle existing directory
         if export_path.exists() and replace_existing:
             shutil.rmtree(export_path)
@@ -33,7 +68,73 @@ class CochleaExporter:
         
         export_path.mkdir(exist_ok=True)
         
-        # Ask user for export options
+        print(f"\nExporting with {centerline_mode} centerline and {num_cross_sections} cross sections...")
+        
+        # Generate geometry with high resolution
+        geometry = self.model.generate_geometry(resolution=0.05)
+        
+        # Export files
+        results = {}
+        if parallel:
+            # The writers share no state, and numpy and file I/O release the GIL
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                csv_future = pool.submit(self.export_csv, export_dir, geometry,
+                                         centerline_mode, num_cross_sections)
+                json_future = pool.submit(self.export_json, export_dir,
+                                          centerline_mode, num_cross_sections)
+                results['csv'] = csv_future.result()
+                results['json'] = json_future.result()
+        else:
+            results['csv'] = self.export_csv(export_dir, geometry, centerline_mode, num_cross_sections)
+            results['json'] = self.export_json(export_dir, centerline_mode, num_cross_sections)
+        
+        self._print_export_summary(export_dir, results, centerline_mode, num_cross_sections)
+        return results
+    
+    def _existing_results(self, export_path, centerline_mode, num_cross_sections):
+        """
+        Check whether export_path already holds this exact export.
+        
+        Returns:
+            results dict as returned by export_all, or None if any file is
+            missing or the saved parameters/options differ
+        """
+        json_file = export_path / 'cochlea_parameters.json'
+        centerline_file = export_path / 'centerline.csv'
+        cross_section_files = [export_path / f'cross_section_{i+1}.csv'
+                               for i in range(num_cross_sections)]
+        
+        if not all(path.is_file() for path in [json_file, centerline_file] + cross_section_files):
+            return None
+        
+        try:
+            with open(json_file) as f:
+                data = json.load(f)
+            saved = [data['parameters'][name] for name in ('A1', 'B1', 'A2', 'B2')]
+            export_info = data['export_info']
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        
+        if (saved != [float(a) for a in self.model.A]
+                or export_info.get('centerline_mode') != centerline_mode
+                or export_info.get('cross_sections') != num_cross_sections):
+            return None
+        
+        return {
+            'csv': {
+                'centerline': str(centerline_file),
+                'cross_sections': [str(path) for path in cross_section_files]
+            },
+            'json': str(json_file)
+        }
+    
+    def prompt_export_options(self):
+        """
+        Ask the user for export options on the console.
+        
+        Returns:
+            tuple of (centerline_mode, num_cross_sections)
+        """
         print("\n" + "="*60)
         print("EXPORT OPTIONS")
         print("="*60)
@@ -72,96 +173,66 @@ class CochleaExporter:
             except ValueError:
                 print("Invalid input. Please enter a number.")
         
-        print(f"\nExporting with {centerline_mode} centerline and {num_cross_sections} cross sections...")
-        
-        # Generate geometry with high resolution
-        geometry = self.model.generate_geometry(resolution=0.05)
-        
-        # Export files
-        results = {}
-        results['csv'] = self.export_csv(export_dir, geometry, centerline_mode, num_cross_sections)
-        results['json'] = self.export_json(export_dir, centerline_mode, num_cross_sections)
-        
-        self._print_export_summary(export_dir, results, centerline_mode, num_cross_sections)
-        return results
+        return centerline_mode, num_cross_sections
     
     def export_csv(self, export_dir, geometry, centerline_mode, num_cross_sections):
         """Export centerline and cross-section points as CSV files."""
         export_path = Path(export_dir)
+        # %.6f output only needs single precision
+        centerline = geometry['centerline'].astype(np.float32, copy=False)
         
         # Export centerline - ALWAYS use X,Y,Z format for Fusion 360 compatibility
-        centerline_data = []
         n_points = 100  # Optimal for smooth curves
-        indices = np.linspace(0, len(geometry['centerline'][0])-1, n_points, dtype=int)
+        indices = np.linspace(0, len(centerline[0])-1, n_points, dtype=int)
+        centerline_points = centerline[:, indices].T * 0.1  # mm to cm
         
-        for i in indices:
-            x = geometry['centerline'][0, i] * 0.1  # mm to cm
-            y = geometry['centerline'][1, i] * 0.1
-            
-            if centerline_mode == '3D':
-                z = geometry['centerline'][2, i] * 0.1
-            else:  # 2D mode - set Z to 0
-                z = 0.0
-            
-            # Always export as X,Y,Z for Fusion 360 compatibility
-            centerline_data.append(f"{x:.6f},{y:.6f},{z:.6f}")
+        if centerline_mode == '2D':  # 2D mode - set Z to 0
+            centerline_points[:, 2] = 0.0
         
+        # Always export as X,Y,Z for Fusion 360 compatibility
         centerline_file = export_path / 'centerline.csv'
-        with open(centerline_file, 'w') as f:
-            f.write('\n'.join(centerline_data))
+        with open(centerline_file, 'w', buffering=1 << 20) as f:
+            f.write(format_points_csv(centerline_points))
         
         # Generate cross sections with user-specified count
-        section_positions = np.linspace(0, 1, num_cross_sections)
         cross_section_files = []
+        n_phi = len(geometry['phi'])
+        section_indices = np.linspace(0, n_phi - 1, num_cross_sections, dtype=int)
+        phis = geometry['phi'][section_indices]
+        centers = centerline[:, section_indices]
         
-        for section_idx, position in enumerate(section_positions):
-            # Get position along centerline
-            idx = int(position * (len(geometry['phi']) - 1))
-            phi = geometry['phi'][idx]
-            
-            # Center point
-            center = np.array([
-                geometry['centerline'][0, idx],
-                geometry['centerline'][1, idx],
-                geometry['centerline'][2, idx]
-            ])
-            
-            # Calculate radius (decreases from base to apex)
-            radius = (self.model.c_length - phi) / self.model.c_length * 0.5 + 0.6
-            
-            # Calculate orientation vectors
-            if idx < len(geometry['phi']) - 1:
-                next_idx = idx + 1
-            else:
-                next_idx = idx
-                idx = idx - 1
-            
-            # Calculate tangent vector
-            if centerline_mode == '3D':
-                # Full 3D tangent
-                tangent = np.array([
-                    geometry['centerline'][0, next_idx] - geometry['centerline'][0, idx],
-                    geometry['centerline'][1, next_idx] - geometry['centerline'][1, idx],
-                    geometry['centerline'][2, next_idx] - geometry['centerline'][2, idx]
-                ])
-            else:  # 2D mode
-                # Use only XY tangent, but create 3D perpendicular planes
-                tangent = np.array([
-                    geometry['centerline'][0, next_idx] - geometry['centerline'][0, idx],
-                    geometry['centerline'][1, next_idx] - geometry['centerline'][1, idx],
-                    0.0  # No Z component for 2D tangent
-                ])
-            
-            tangent = tangent / np.linalg.norm(tangent)
-            
-            # Create perpendicular vectors
-            if abs(tangent[2]) < 0.9:
-                perp1 = np.cross([0, 0, 1], tangent)
-            else:
-                perp1 = np.cross([1, 0, 0], tangent)
-            perp1 = perp1 / np.linalg.norm(perp1)
-            perp2 = np.cross(tangent, perp1)
-            perp2 = perp2 / np.linalg.norm(perp2)
+        # Calculate radius (decreases from base to apex)
+        radii = (self.model.c_length - phis) / self.model.c_length * 0.5 + 0.6
+        
+        # Forward-difference tangents; the last section reuses the final segment
+        base_indices = np.minimum(section_indices, n_phi - 2)
+        tangents = centerline[:, base_indices + 1] - centerline[:, base_indices]
+        
+        if centerline_mode == '2D':
+            # Use only XY tangent, but create 3D perpendicular planes
+            tangents[2] = 0.0
+            # Center at XY position with Z=0, but cross section is still perpendicular
+            centers[2] = 0.0
+        
+        tangents /= np.linalg.norm(tangents, axis=0)
+        
+        # Create perpendicular vectors (vectors run along axis 0)
+        z_axis = np.array([[0.0], [0.0], [1.0]])
+        x_axis = np.array([[1.0], [0.0], [0.0]])
+        ref_axes = np.where(np.abs(tangents[2]) < 0.9, z_axis, x_axis)
+        perp1 = np.cross(ref_axes, tangents, axis=0)
+        perp1 /= np.linalg.norm(perp1, axis=0)
+        perp2 = np.cross(tangents, perp1, axis=0)
+        perp2 /= np.linalg.norm(perp2, axis=0)
+        
+        n_circle_points = 60  # Smooth circle
+        angles = np.linspace(0, 2*np.pi, n_circle_points+1)  # Include endpoint
+        cos_a = np.cos(angles)
+        sin_a = np.sin(angles)
+        
+        for section_idx in range(num_cross_sections):
+            center = centers[:, section_idx]
+            radius = radii[section_idx]
             
             # Generate filename
             filename = f'cross_section_{section_idx+1}.csv'
@@ -169,25 +240,13 @@ class CochleaExporter:
             cross_section_files.append(str(cross_section_file))
             
             # Write cross section - perpendicular to centerline
-            with open(cross_section_file, 'w') as f:
-                n_circle_points = 60  # Smooth circle
-                angles = np.linspace(0, 2*np.pi, n_circle_points+1)  # Include endpoint
-                
-                for angle in angles:
-                    local_x = radius * np.cos(angle)
-                    local_y = radius * np.sin(angle)
-                    
-                    # Generate perpendicular cross section
-                    if centerline_mode == '2D':
-                        # For 2D mode: center at XY position with Z=0, but cross section is still perpendicular
-                        center_2d = np.array([center[0], center[1], 0.0])
-                        point = center_2d + local_x * perp1 + local_y * perp2
-                    else:
-                        # For 3D mode: normal positioning
-                        point = center + local_x * perp1 + local_y * perp2
-                    
-                    # Convert to cm
-                    f.write(f"{point[0]*0.1:.6f},{point[1]*0.1:.6f},{point[2]*0.1:.6f}\n")
+            points = (center[None, :]
+                      + (radius * cos_a)[:, None] * perp1[None, :, section_idx]
+                      + (radius * sin_a)[:, None] * perp2[None, :, section_idx])
+            points *= 0.1  # Convert to cm
+            
+            with open(cross_section_file, 'w', buffering=1 << 20) as f:
+                f.write(format_points_csv(points))
         
         return {
             'centerline': str(centerline_file), 
@@ -199,8 +258,8 @@ class CochleaExporter:
         export_path = Path(export_dir)
         
         # Calculate cross section positions
-        positions = np.linspace(0, 1, num_cross_sections).tolist()
-        positions = [round(p, 3) for p in positions]
+        positions = np.round(np.linspace(0, 1, num_cross_sections), 3).tolist()
+        length_with_height, length_without_height = self.model.calculate_lengths()
         
         data = {
             'parameters': {
@@ -211,8 +270,8 @@ class CochleaExporter:
             },
             'derived': {
                 'turns': float(self.model.n_turns),
-                'length_with_height': float(self.model.calculate_length(True)),
-                'length_without_height': float(self.model.calculate_length(False))
+                'length_with_height': float(length_with_height),
+                'length_without_height': float(length_without_height)
             },
             'export_info': {
                 'centerline_mode': centerline_mode,
@@ -226,7 +285,7 @@ class CochleaExporter:
         }
         
         json_file = export_path / 'cochlea_parameters.json'
-        with open(json_file, 'w') as f:
+        with open(json_file, 'w', buffering=1 << 20) as f:
             json.dump(data, f, indent=2)
         
         return str(json_file)
@@ -3,10 +3,84 @@ Cochlea Model Module
 Core mathematical equations and geometry generation for cochlea modeling
 """
 
+import os
+import threading
 import numpy as np
-from scipy.integrate import quad
+from numpy.polynomial.polynomial import polyval as npp_polyval
+from scipy.integrate import simpson
 from cochlea_parameters import CochleaParameters
 
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+    
+    def njit(*args, **kwargs):
+        """No-op stand-in so the kernels below still define without numba."""
+        def decorator(func):
+            return func
+        return decorator
+
+
+@njit(cache=True, fastmath=True)
+def _horner(x, coeffs):
+    """Evaluate an ascending-order polynomial at scalar x."""
+    y = 0.0
+    for k in range(len(coeffs) - 1, -1, -1):
+        y = y * x + coeffs[k]
+    return y
+
+
+@njit(cache=True, fastmath=True)
+def _length_integrands(z, rc, drc, dhc):
+    """Arc-length integrands of the spiral at z, with and without height."""
+    with_h = np.empty(z.shape[0])
+    without_h = np.empty(z.shape[0])
+    for i in range(z.shape[0]):
+        r = _horner(z[i], rc)
+        dr_dz = _horner(z[i], drc)
+        dh_dz = _horner(z[i], dhc)
+        
+        # x'^2 + y'^2 of (r cos z, r sin z) reduces to r'^2 + r^2
+        planar = dr_dz * dr_dz + r * r
+        with_h[i] = np.sqrt(planar + dh_dz * dh_dz)
+        without_h[i] = np.sqrt(planar)
+    return with_h, without_h
+
+
+@njit(cache=True, fastmath=True)
+def _fill_scala(phi, v, r_modiolus, c_length, z_center, scala_x, scala_y, scala_z):
+    """Fill scala surface grids of shape (len(v), len(phi)) in place."""
+    cos_phi = np.cos(phi)
+    sin_phi = np.sin(phi)
+    # Scala radius decreases from base to apex
+    r_scala = (c_length - phi) / c_length * 0.5 + 0.6
+    
+    for j in range(v.shape[0]):
+        cos_v = np.cos(v[j])
+        sin_v = np.sin(v[j])
+        for i in range(phi.shape[0]):
+            local_r = r_modiolus[i] + r_scala[i] * (cos_v - 1)
+            scala_x[j, i] = local_r * cos_phi[i]
+            scala_y[j, i] = local_r * sin_phi[i]
+            scala_z[j, i] = r_scala[i] * sin_v + z_center[i]
+
+
+def _warmup_kernels():
+    """Compile the numba kernels for the argument types the model uses."""
+    x = np.linspace(0.0, 1.0, 8)
+    coeffs = np.ones(3)
+    _length_integrands(x, coeffs, coeffs, coeffs)
+    for dtype in (np.float64, np.float32):
+        grid = np.empty((2, len(x)), dtype=dtype)
+        _fill_scala(x, x[:2], x, 1.0, x, grid, grid.copy(), grid.copy())
+
+
+# Opt-in, so plain imports do not pay the compile (or cache load) cost
+if HAS_NUMBA and os.environ.get('COCHLEA_WARMUP'):
+    _warmup_kernels()
+
 
 class CochleaModel:
     """Core cochlea mathematical model."""
@@ -29,6 +103,24 @@ class CochleaModel:
             self.param_manager.validate_parameters(parameters)
             self.A = np.array(parameters)
         
+        # Polynomial coefficients derived from A
+        self._set_parameters(self.A)
+        
+        # Default generate_geometry storage; see to_float32_contiguous
+        self.precision = 'f64'
+        
+        # Guards the caches below; export and plotting may share a model
+        # across threads
+        self._cache_lock = threading.RLock()
+        
+        # generate_geometry results, valid for the model state in _geom_cache_state
+        self._geom_cache = {}
+        self._geom_cache_state = None
+        
+        # calculate_lengths result, valid for the model state in _lengths_state
+        self._lengths = None
+        self._lengths_state = None
+        
         # Calculate derived parameters
         self.c_length = self._turn_number_estimation() * 2 * np.pi
         self.n_turns = self.c_length / (2 * np.pi)
@@ -37,99 +129,231 @@ class CochleaModel:
               f"A2 = {self.A[2]:.3f}, B2 = {self.A[3]:.3f}")
         print(f"Estimated number of turns: {self.n_turns:.3f}")
     
+    def _set_parameters(self, A):
+        """Derive every polynomial coefficient array from the parameters A."""
+        A = np.asarray(A, dtype=float)
+        
+        # Polynomial coefficients in ascending order of power
+        a_ext = np.concatenate(([1.0], A))
+        self._radius_coeffs = self.coefs['modiolus'].T @ a_ext
+        self._height_coeffs = self.coefs['height'].T @ a_ext
+        self._dr_coeffs = self._radius_coeffs[1:] * np.arange(1, len(self._radius_coeffs))
+        self._dh_coeffs = self._height_coeffs[1:] * np.arange(1, len(self._height_coeffs))
+        
+        # Radius (zero-padded) and height coefficients stacked so both
+        # polynomials evaluate as one matrix product against powers of phi
+        self._poly_matrix = np.zeros((2, len(self._height_coeffs)))
+        self._poly_matrix[0, :len(self._radius_coeffs)] = self._radius_coeffs
+        self._poly_matrix[1] = self._height_coeffs
+        
+        self._coeffs_A = A.tobytes()
+    
+    def _sync_parameters(self):
+        """Re-derive the coefficients if self.A was reassigned or modified in place."""
+        params_key = np.asarray(self.A, dtype=float).tobytes()
+        with self._cache_lock:
+            if params_key != self._coeffs_A:
+                self._set_parameters(self.A)
+        return params_key
+    
+    def _cache_state(self):
+        """Key of the model state that cached geometry and lengths depend on."""
+        return self._sync_parameters(), self.c_length
+    
     def _turn_number_estimation(self):
         """Estimate number of turns."""
         return np.dot(np.append(1, self.A), self.coefs['turns']) / 360
     
     def _radius_modiolus_poly(self, phi):
         """Calculate radius from modiolus at angle phi."""
-        coeffs = []
-        for i in range(4):
-            coeffs.append(np.dot(np.append(1, self.A), self.coefs['modiolus'][:, i]))
-        return np.polyval(coeffs[::-1], phi)
+        self._sync_parameters()
+        return npp_polyval(phi, self._radius_coeffs)
     
     def _height_poly(self, phi):
         """Calculate height at angle phi."""
-        coeffs = []
-        for i in range(5):
-            coeffs.append(np.dot(np.append(1, self.A), self.coefs['height'][:, i]))
-        return np.polyval(coeffs[::-1], phi)
+        self._sync_parameters()
+        return npp_polyval(phi, self._height_coeffs)
     
     def get_radius_coeffs(self):
         """Get polynomial coefficients for radius."""
-        coeffs = []
-        for i in range(4):
-            coeffs.append(np.dot(np.append(1, self.A), self.coefs['modiolus'][:, i]))
-        return coeffs[::-1]
+        self._sync_parameters()
+        return list(self._radius_coeffs[::-1])
     
     def get_height_coeffs(self):
         """Get polynomial coefficients for height."""
-        coeffs = []
-        for i in range(5):
-            coeffs.append(np.dot(np.append(1, self.A), self.coefs['height'][:, i]))
-        return coeffs[::-1]
+        self._sync_parameters()
+        return list(self._height_coeffs[::-1])
     
     def calculate_length(self, with_height=True):
         """Calculate the length of the cochlea spiral."""
-        def integrand(z):
+        length_with_height, length_without_height = self.calculate_lengths()
+        return length_with_height if with_height else length_without_height
+    
+    def calculate_lengths(self):
+        """
+        Calculate the spiral length with and without height in one pass.
+        
+        Both integrals share the sampled radius and its derivative, and the
+        result is cached until self.A or c_length changes.
+        
+        Returns:
+            tuple of (length_with_height, length_without_height)
+        """
+        with self._cache_lock:
+            state = self._cache_state()
+            if state == self._lengths_state:
+                return self._lengths
+        
+        # The integrand is smooth, so a dense fixed grid is accurate enough
+        z = np.linspace(0, self.c_length, 4097)
+        
+        if HAS_NUMBA:
+            with_h, without_h = _length_integrands(z, self._radius_coeffs, self._dr_coeffs,
+                                                   self._dh_coeffs)
+        else:
             r = self._radius_modiolus_poly(z)
-            dr_dz = np.polyder(np.poly1d(self.get_radius_coeffs()))(z)
+            dr_dz = npp_polyval(z, self._dr_coeffs)
+            dh_dz = npp_polyval(z, self._dh_coeffs)
             
-            x_deriv = dr_dz * np.cos(z) - r * np.sin(z)
-            y_deriv = dr_dz * np.sin(z) + r * np.cos(z)
-            
-            if with_height:
-                dh_dz = np.polyder(np.poly1d(self.get_height_coeffs()))(z)
-                return np.sqrt(x_deriv**2 + y_deriv**2 + dh_dz**2)
-            else:
-                return np.sqrt(x_deriv**2 + y_deriv**2)
+            # x'^2 + y'^2 of (r cos z, r sin z) reduces to r'^2 + r^2
+            planar = dr_dz**2 + r**2
+            with_h = np.sqrt(planar + dh_dz**2)
+            without_h = np.sqrt(planar)
         
-        length, _ = quad(integrand, 0, self.c_length)
-        return length
+        lengths = (simpson(with_h, x=z), simpson(without_h, x=z))
+        with self._cache_lock:
+            if self._cache_state() == state:
+                self._lengths = lengths
+                self._lengths_state = state
+        return lengths
     
-    def generate_geometry(self, resolution=0.1):
+    def generate_geometry(self, resolution=0.1, scala_memmap_path=None, precision=None):
         """
         Generate the 3D geometry of the cochlea.
         
+        Results are cached per argument set until self.A or c_length
+        changes; the returned arrays are read-only.
+        
         Args:
             resolution: Angular resolution in radians
+            scala_memmap_path: Optional path prefix; if given, the scala
+                surface arrays are backed by '<prefix>_x.dat' etc. on disk
+            precision: 'f64' or 'f32' storage for the scala surface and
+                centerline arrays (default: self.precision)
             
         Returns:
-            dict with centerline, scala surface, phi angles, and turns
+            dict with centerline, scala surface, phi angles (and their
+            cos/sin), and turns
+        """
+        if precision is None:
+            precision = self.precision
+        if precision not in ('f64', 'f32'):
+            raise ValueError("Precision must be 'f64' or 'f32'")
+        
+        key = (resolution, scala_memmap_path, precision)
+        with self._cache_lock:
+            state = self._cache_state()
+            if state != self._geom_cache_state:
+                self._geom_cache.clear()
+                self._geom_cache_state = state
+            geometry = self._geom_cache.get(key)
+        
+        if geometry is None:
+            # Built outside the lock so different resolutions (e.g. export
+            # and plotting threads) can be generated at the same time
+            geometry = self._build_geometry(resolution, scala_memmap_path, precision)
+            with self._cache_lock:
+                if self._geom_cache_state == state:
+                    geometry = self._geom_cache.setdefault(key, geometry)
+        return geometry
+    
+    def to_float32_contiguous(self):
+        """
+        Switch generated geometry to contiguous float32 arrays.
+        
+        Later generate_geometry calls without an explicit precision return
+        float32 centerline and scala arrays, which halves the memory that
+        plotting and export move. Previously cached geometry is dropped.
+        
+        Returns:
+            self, for chaining
         """
+        with self._cache_lock:
+            self.precision = 'f32'
+            self._geom_cache.clear()
+        return self
+    
+    def _build_geometry(self, resolution, scala_memmap_path, precision):
+        """Compute the geometry dict returned by generate_geometry."""
+        dtype = np.float32 if precision == 'f32' else np.float64
+        
         phi = np.arange(0, self.c_length, resolution)
+        cos_phi = np.cos(phi)
+        sin_phi = np.sin(phi)
         
         # Calculate centerline
-        r_modiolus = self._radius_modiolus_poly(phi)
+        powers = np.vander(phi, self._poly_matrix.shape[1], increasing=True)
+        r_modiolus, height = self._poly_matrix @ powers.T
         centerline = np.array([
-            r_modiolus * np.cos(phi),
-            r_modiolus * np.sin(phi),
-            self._height_poly(phi)
+            r_modiolus * cos_phi,
+            r_modiolus * sin_phi,
+            height
         ])
         
-        # Generate scala surface
+        # Generate scala surface: rows follow the cross-section angle v,
+        # columns follow phi along the spiral
         v = np.arange(0, 2*np.pi, resolution)
-        scala_x = np.zeros((len(v), len(phi)))
-        scala_y = np.zeros((len(v), len(phi)))
-        scala_z = np.zeros((len(v), len(phi)))
+        shape = (len(v), len(phi))
+        
+        if scala_memmap_path is not None:
+            scala_x, scala_y, scala_z = (
+                np.memmap(f"{scala_memmap_path}_{axis}.dat", dtype=dtype,
+                          mode='w+', shape=shape)
+                for axis in 'xyz'
+            )
+        else:
+            # Every element is written below, so skip the zero-fill pass
+            scala_x = np.empty(shape, dtype=dtype)
+            scala_y = np.empty_like(scala_x)
+            scala_z = np.empty_like(scala_x)
         
-        for i, p in enumerate(phi):
+        if HAS_NUMBA:
+            _fill_scala(phi, v, r_modiolus, self.c_length, centerline[2],
+                        scala_x, scala_y, scala_z)
+        else:
+            cos_v = np.cos(v)
+            sin_v = np.sin(v)
+            
             # Scala radius decreases from base to apex
-            r_scala = (self.c_length - p) / self.c_length * 0.5 + 0.6
+            r_scala = (self.c_length - phi) / self.c_length * 0.5 + 0.6
             
-            for j, angle in enumerate(v):
-                # Generate circular cross-section
-                local_r = r_modiolus[i] + r_scala * (np.cos(angle) - 1)
-                scala_x[j, i] = local_r * np.cos(p)
-                scala_y[j, i] = local_r * np.sin(p)
-                scala_z[j, i] = r_scala * np.sin(angle) + centerline[2, i]
+            local_r = r_modiolus[None, :] + r_scala[None, :] * (cos_v[:, None] - 1)
+            np.multiply(local_r, cos_phi[None, :], out=scala_x)
+            np.multiply(local_r, sin_phi[None, :], out=scala_y)
+            np.multiply(r_scala[None, :], sin_v[:, None], out=scala_z)
+            scala_z += centerline[2][None, :]
+        
+        if scala_memmap_path is not None:
+            for arr in (scala_x, scala_y, scala_z):
+                arr.flush()
+        
+        if dtype is np.float32:
+            centerline = np.ascontiguousarray(centerline, dtype=np.float32)
+        turns = phi / (2 * np.pi)
+        
+        # The result is cached and shared between callers, so lock it
+        for arr in (centerline, scala_x, scala_y, scala_z, phi, turns,
+                    r_modiolus, cos_phi, sin_phi):
+            arr.setflags(write=False)
         
         return {
             'centerline': centerline,
             'scala': {'x': scala_x, 'y': scala_y, 'z': scala_z},
             'phi': phi,
-            'turns': phi / (2 * np.pi),
-            'r_modiolus': r_modiolus
+            'turns': turns,
+            'r_modiolus': r_modiolus,
+            'cos_phi': cos_phi,
+            'sin_phi': sin_phi
         }
     
     def generate_cross_sections(self, geometry=None, num_sections=10):
@@ -142,34 +366,35 @@ class CochleaModel:
         
         cross_sections = []
         
-        for idx in section_indices:
-            phi = geometry['phi'][idx]
-            center = geometry['centerline'][:, idx]
-            radius = (self.c_length - phi) / self.c_length * 0.5 + 0.6
-            
-            # Generate circular cross section
-            n_points = 16  # Points for smooth curves
-            angles = np.linspace(0, 2*np.pi, n_points+1)
+        # Generate circular cross sections
+        n_points = 16  # Points for smooth curves
+        angles = np.linspace(0, 2*np.pi, n_points+1)
+        cos_a = np.cos(angles)
+        sin_a = np.sin(angles)
+        
+        # Gather the sampled centerline data for all sections at once
+        phis = geometry['phi'][section_indices]
+        centers = geometry['centerline'][:, section_indices].T
+        radii = (self.c_length - phis) / self.c_length * 0.5 + 0.6
+        cos_phis = geometry['cos_phi'][section_indices]
+        sin_phis = geometry['sin_phi'][section_indices]
+        
+        for phi, center, radius, cos_phi, sin_phi in zip(phis, centers, radii,
+                                                         cos_phis, sin_phis):
+            local_r = radius * (cos_a - 1)
+            points = np.column_stack([
+                center[0] + local_r * cos_phi,
+                center[1] + local_r * sin_phi,
+                center[2] + radius * sin_a
+            ])
             
-            section = {
+            cross_sections.append({
                 'center': center,
                 'radius': radius,
                 'angle': phi * 180 / np.pi,
                 'phi': phi,
-                'points': []
-            }
-            
-            for angle in angles:
-                local_r = radius * (np.cos(angle) - 1)
-                local_h = radius * np.sin(angle)
-                
-                x = center[0] + local_r * np.cos(phi)
-                y = center[1] + local_r * np.sin(phi)
-                z = center[2] + local_h
-                
-                section['points'].append([x, y, z])
-            
-            cross_sections.append(section)
+                'points': points
+            })
         
         return cross_sections
     
@@ -3,10 +3,19 @@ Cochlea Visualization Module
 Handles all plotting and visualization for cochlea models
 """
 
+import shutil
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.animation import FFMpegWriter
 from mpl_toolkits.mplot3d import Axes3D
-import matplotlib.animation as animation
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
+from PIL import Image
+
+
+def _wireframe_stride(shape, max_quads=2000):
+    """Smallest grid stride that keeps a surface at or below max_quads quads."""
+    quads = (shape[0] - 1) * (shape[1] - 1)
+    return max(1, int(np.ceil(np.sqrt(quads / max_quads))))
 
 
 class CochleaVisualizer:
@@ -24,9 +33,9 @@ class CochleaVisualizer:
     def plot_parameters(self, geometry=None):
         """Plot parameter estimations and model characteristics."""
         if geometry is None:
-            geometry = self.model.generate_geometry()
+            geometry = self.model.generate_geometry(precision='f32')
         
-        fig = plt.figure(figsize=(12, 5))
+        fig = plt.figure(figsize=(12, 5), constrained_layout=True)
         
         # Plot 1: Distance from Modiolus
         ax1 = fig.add_subplot(1, 2, 1)
@@ -40,7 +49,7 @@ class CochleaVisualizer:
         
         # Plot 2: Height Profile
         ax2 = fig.add_subplot(1, 2, 2)
-        height = self.model._height_poly(geometry['phi'])
+        height = geometry['centerline'][2]
         ax2.plot(geometry['turns'], height, 'g-', linewidth=2)
         ax2.set_xlabel('Turns')
         ax2.set_ylabel('Height (mm)')
@@ -48,11 +57,11 @@ class CochleaVisualizer:
         ax2.grid(True, alpha=0.3)
         ax2.set_xlim(-0.25, np.ceil(geometry['turns'][-1]))
         
-        plt.tight_layout()
         return fig
     
     def plot_3d_model(self, show_modiolus=True, show_scala=True, 
-                      show_centerline=True, view_angle=(15, 15)):
+                      show_centerline=True, view_angle=(15, 15), geometry=None,
+                      downsample=False):
         """
         Create 3D visualization of the cochlea.
         
@@ -61,10 +70,14 @@ class CochleaVisualizer:
             show_scala: Display scala surface
             show_centerline: Display centerline curve
             view_angle: Tuple of (elevation, azimuth) angles
+            geometry: Precomputed geometry dict (generated if None)
+            downsample: Draw the scala as a strided wireframe of at most
+                2000 quads instead of a full surface
         """
-        geometry = self.model.generate_geometry()
+        if geometry is None:
+            geometry = self.model.generate_geometry(precision='f32')
         
-        fig = plt.figure(figsize=(10, 10))
+        fig = plt.figure(figsize=(10, 10), constrained_layout=True)
         ax = fig.add_subplot(111, projection='3d')
         
         # Plot modiolus (central axis)
@@ -75,7 +88,14 @@ class CochleaVisualizer:
                    color='gray', linewidth=5, alpha=0.6, label='Modiolus')
         
         # Plot scala surface
-        if show_scala:
+        if show_scala and downsample:
+            s = _wireframe_stride(geometry['scala']['x'].shape)
+            ax.plot_wireframe(geometry['scala']['x'][::s, ::s],
+                              geometry['scala']['y'][::s, ::s],
+                              geometry['scala']['z'][::s, ::s],
+                              color=plt.cm.winter(0.5), linewidth=0.5,
+                              alpha=0.3, label='Scala')
+        elif show_scala:
             surf = ax.plot_surface(geometry['scala']['x'], 
                                  geometry['scala']['y'], 
                                  geometry['scala']['z'],
@@ -96,19 +116,14 @@ class CochleaVisualizer:
         ax.set_title('3D Cochlea Model')
         
         # Set equal aspect ratio
-        max_range = np.array([
-            geometry['centerline'][0].max() - geometry['centerline'][0].min(),
-            geometry['centerline'][1].max() - geometry['centerline'][1].min(),
-            geometry['centerline'][2].max() - geometry['centerline'][2].min()
-        ]).max() / 2.0
+        cl = geometry['centerline']
+        extent = np.ptp(cl, axis=1)
+        mid = cl.min(axis=1) + 0.5 * extent
+        max_range = extent.max() / 2.0
         
-        mid_x = (geometry['centerline'][0].max() + geometry['centerline'][0].min()) * 0.5
-        mid_y = (geometry['centerline'][1].max() + geometry['centerline'][1].min()) * 0.5
-        mid_z = (geometry['centerline'][2].max() + geometry['centerline'][2].min()) * 0.5
-        
-        ax.set_xlim(mid_x - max_range, mid_x + max_range)
-        ax.set_ylim(mid_y - max_range, mid_y + max_range)
-        ax.set_zlim(mid_z - max_range, mid_z + max_range)
+        ax.set_xlim(mid[0] - max_range, mid[0] + max_range)
+        ax.set_ylim(mid[1] - max_range, mid[1] + max_range)
+        ax.set_zlim(mid[2] - max_range, mid[2] + max_range)
         
         # Set viewing angle
         ax.view_init(elev=view_angle[0], azim=view_angle[1])
@@ -116,7 +131,6 @@ class CochleaVisualizer:
         # Add legend
         ax.legend()
         
-        plt.tight_layout()
         return fig, ax
     
     def plot_cross_sections(self, cross_sections=None):
@@ -124,16 +138,23 @@ class CochleaVisualizer:
         if cross_sections is None:
             cross_sections = self.model.generate_cross_sections()
         
-        fig = plt.figure(figsize=(12, 8))
+        # Stack sections as (n_sections, n_points, 3) and offset by centers
+        all_pts = np.stack([section['points'] for section in cross_sections])
+        centers = np.stack([section['center'] for section in cross_sections])
+        local = all_pts - centers[:, None, :]
+        
+        fig = plt.figure(figsize=(12, 8), constrained_layout=True)
+        # Constrained layout does not reserve room for the mplot3d z-label,
+        # which would otherwise overlap the 2D panel's y-label
+        fig.get_layout_engine().set(wspace=0.08)
         
         # Plot all cross sections in 3D
         ax1 = fig.add_subplot(121, projection='3d')
         
-        for i, section in enumerate(cross_sections):
-            points = np.array(section['points'])
-            ax1.plot(points[:, 0], points[:, 1], points[:, 2], 
-                    'b-', linewidth=2, alpha=0.7)
-            ax1.scatter(*section['center'], c='r', s=50)
+        # One collection for all outlines; collections do not autoscale in 3D
+        ax1.add_collection3d(Line3DCollection(all_pts, colors='b', linewidths=2, alpha=0.7))
+        ax1.auto_scale_xyz(all_pts[..., 0], all_pts[..., 1], all_pts[..., 2])
+        ax1.scatter(centers[:, 0], centers[:, 1], centers[:, 2], c='r', s=50)
         
         ax1.set_xlabel('X (mm)')
         ax1.set_ylabel('Y (mm)')
@@ -143,17 +164,12 @@ class CochleaVisualizer:
         # Plot cross section shapes in 2D
         ax2 = fig.add_subplot(122)
         
+        # Simple 2D projection (X width against Z height); one line per
+        # section, so legend(loc='best') can see the outlines it must avoid
+        n_sections = len(cross_sections)
+        colors = plt.cm.viridis(np.arange(n_sections) / n_sections)
         for i, section in enumerate(cross_sections):
-            # Project onto plane perpendicular to centerline
-            points = np.array(section['points'])
-            center = section['center']
-            
-            # Simple 2D projection
-            local_x = points[:, 0] - center[0]
-            local_y = points[:, 2] - center[2]
-            
-            color = plt.cm.viridis(i / len(cross_sections))
-            ax2.plot(local_x, local_y, color=color, 
+            ax2.plot(local[i, :, 0], local[i, :, 2], color=colors[i],
                     label=f'Turn {section["phi"]/(2*np.pi):.2f}')
         
         ax2.set_xlabel('Width (mm)')
@@ -163,20 +179,32 @@ class CochleaVisualizer:
         ax2.grid(True, alpha=0.3)
         ax2.legend()
         
-        plt.tight_layout()
         return fig
     
-    def create_animation(self, filename='cochlea_rotation.gif', duration=10):
+    def create_animation(self, filename='cochlea_rotation.gif', duration=10, geometry=None,
+                         writer='auto', dpi=72):
         """
         Create rotating animation of the 3D model.
         
         Args:
             filename: Output filename
             duration: Animation duration in seconds
+            geometry: Precomputed geometry dict (generated if None)
+            writer: 'ffmpeg' (H.264 video), 'pillow' (GIF) or 'auto', which
+                uses ffmpeg when it is installed and filename is not a .gif
+            dpi: Frame resolution in dots per inch
         """
-        geometry = self.model.generate_geometry()
+        if writer not in ('auto', 'ffmpeg', 'pillow'):
+            raise ValueError("Writer must be 'auto', 'ffmpeg' or 'pillow'")
+        if writer == 'auto':
+            use_ffmpeg = (shutil.which('ffmpeg') is not None
+                          and not filename.lower().endswith('.gif'))
+            writer = 'ffmpeg' if use_ffmpeg else 'pillow'
         
-        fig = plt.figure(figsize=(8, 8))
+        if geometry is None:
+            geometry = self.model.generate_geometry(precision='f32')
+        
+        fig = plt.figure(figsize=(8, 8), dpi=dpi)
         ax = fig.add_subplot(111, projection='3d')
         
         # Set up the plot
@@ -184,10 +212,14 @@ class CochleaVisualizer:
                [geometry['centerline'][2, 0] - 1, geometry['centerline'][2, -1] + 1],
                color='gray', linewidth=5, alpha=0.6)
         
-        ax.plot_surface(geometry['scala']['x'], 
-                       geometry['scala']['y'], 
-                       geometry['scala']['z'],
-                       alpha=0.3, cmap='winter', edgecolor='none')
+        # The scala is re-projected every frame as the camera moves, so
+        # draw it as a coarse wireframe rather than a full surface
+        s = _wireframe_stride(geometry['scala']['x'].shape)
+        ax.plot_wireframe(geometry['scala']['x'][::s, ::s],
+                          geometry['scala']['y'][::s, ::s],
+                          geometry['scala']['z'][::s, ::s],
+                          color=plt.cm.winter(0.5), linewidth=0.5, alpha=0.3,
+                          antialiased=False)
         
         ax.plot(geometry['centerline'][0], 
                geometry['centerline'][1], 
@@ -199,31 +231,46 @@ class CochleaVisualizer:
         ax.set_zlabel('Z (mm)')
         ax.set_title('3D Cochlea Model')
         
-        # Animation function
-        def rotate(frame):
-            ax.view_init(elev=15, azim=frame)
-            return ax,
-        
-        # Create animation
-        frames = np.linspace(0, 360, int(duration * 30))
-        anim = animation.FuncAnimation(fig, rotate, frames=frames, 
-                                     interval=1000/30, blit=False)
-        
-        # Save animation
-        anim.save(filename, writer='pillow', fps=30)
-        plt.close()
+        azimuths = np.linspace(0, 360, int(duration * 30))
+        
+        if writer == 'ffmpeg':
+            # Inter-frame video encoding is far cheaper than GIF compression
+            movie_writer = FFMpegWriter(fps=30, bitrate=2000)
+            with movie_writer.saving(fig, filename, dpi):
+                for azim in azimuths:
+                    ax.view_init(elev=15, azim=azim)
+                    movie_writer.grab_frame()
+            plt.close(fig)
+        else:
+            # Render each view into memory and encode the GIF once at the end
+            frames = []
+            for azim in azimuths:
+                ax.view_init(elev=15, azim=azim)
+                fig.canvas.draw()
+                rgba = np.asarray(fig.canvas.buffer_rgba())
+                # convert() copies out of the canvas buffer before the next draw
+                frames.append(Image.fromarray(rgba).convert('RGB'))
+            plt.close(fig)
+            
+            frames[0].save(filename, save_all=True, append_images=frames[1:],
+                           duration=int(1000 / 30), loop=0, optimize=True)
         
         print(f"Animation saved to {filename}")
     
-    def plot_complete_analysis(self):
-        """Create comprehensive visualization with all plots."""
-        fig = plt.figure(figsize=(16, 12))
+    def plot_complete_analysis(self, downsample=False):
+        """
+        Create comprehensive visualization with all plots.
+        
+        Args:
+            downsample: Draw the embedded 3D scala as a strided wireframe of
+                at most 2000 quads instead of a full surface
+        """
+        fig = plt.figure(figsize=(16, 12), constrained_layout=True)
         
-        geometry = self.model.generate_geometry()
+        geometry = self.model.generate_geometry(precision='f32')
         
         # Calculate lengths
-        length_with_height = self.model.calculate_length(with_height=True)
-        length_without_height = self.model.calculate_length(with_height=False)
+        length_with_height, length_without_height = self.model.calculate_lengths()
         
         # Text summary
         ax_text = fig.add_subplot(3, 3, 1)
@@ -254,7 +301,7 @@ class CochleaVisualizer:
         ax1.grid(True, alpha=0.3)
         
         ax2 = fig.add_subplot(3, 3, 3)
-        height = self.model._height_poly(geometry['phi'])
+        height = geometry['centerline'][2]
         ax2.plot(geometry['turns'], height, 'g-', linewidth=2)
         ax2.set_xlabel('Turns')
         ax2.set_ylabel('Height (mm)')
@@ -266,10 +313,17 @@ class CochleaVisualizer:
         ax3.plot([0, 0], [0, 0], 
                 [geometry['centerline'][2, 0] - 1, geometry['centerline'][2, -1] + 1],
                 color='gray', linewidth=5, alpha=0.6)
-        ax3.plot_surface(geometry['scala']['x'], 
-                        geometry['scala']['y'], 
-                        geometry['scala']['z'],
-                        alpha=0.3, cmap='winter', edgecolor='none')
+        if downsample:
+            s = _wireframe_stride(geometry['scala']['x'].shape)
+            ax3.plot_wireframe(geometry['scala']['x'][::s, ::s],
+                               geometry['scala']['y'][::s, ::s],
+                               geometry['scala']['z'][::s, ::s],
+                               color=plt.cm.winter(0.5), linewidth=0.5, alpha=0.3)
+        else:
+            ax3.plot_surface(geometry['scala']['x'], 
+                            geometry['scala']['y'], 
+                            geometry['scala']['z'],
+                            alpha=0.3, cmap='winter', edgecolor='none')
         ax3.plot(geometry['centerline'][0], 
                 geometry['centerline'][1], 
                 geometry['centerline'][2],
@@ -283,13 +337,13 @@ class CochleaVisualizer:
         # Cross sections
         ax4 = fig.add_subplot(3, 3, 9)
         cross_sections = self.model.generate_cross_sections(geometry, num_sections=5)
+        all_pts = np.stack([section['points'] for section in cross_sections])
+        centers = np.stack([section['center'] for section in cross_sections])
+        local = all_pts - centers[:, None, :]
+        n_sections = len(cross_sections)
+        colors = plt.cm.viridis(np.arange(n_sections) / n_sections)
         for i, section in enumerate(cross_sections):
-            points = np.array(section['points'])
-            center = section['center']
-            local_x = points[:, 0] - center[0]
-            local_y = points[:, 2] - center[2]
-            color = plt.cm.viridis(i / len(cross_sections))
-            ax4.plot(local_x, local_y, color=color, linewidth=2,
+            ax4.plot(local[i, :, 0], local[i, :, 2], color=colors[i], linewidth=2,
                     label=f'{section["phi"]/(2*np.pi):.1f} turns')
         ax4.set_xlabel('Width (mm)')
         ax4.set_ylabel('Height (mm)')
@@ -299,5 +353,4 @@ class CochleaVisualizer:
         ax4.legend(fontsize=8)
         
         plt.suptitle('Complete Cochlea Analysis', fontsize=16)
-        plt.tight_layout()
         return fig
\ No newline at end of file
@@ -14,36 +14,39 @@ class FileDocumenter:
     """Document all code files in a project directory."""
     
     # File extensions to include in tree structure
-    TREE_EXTENSIONS = {
+    TREE_EXTENSIONS = frozenset({
         '.py', '.js', '.ts', '.jsx', '.tsx', '.java', '.c', '.cpp', '.h', '.hpp',
         '.cs', '.php', '.rb', '.go', '.rs', '.swift', '.kt', '.scala', '.r',
         '.m', '.html', '.css', '.scss', '.sass', '.less', '.xml', '.json',
         '.yaml', '.yml', '.toml', '.ini', '.cfg', '.conf', '.sh', '.bash',
         '.zsh', '.fish', '.ps1', '.bat', '.cmd', '.dockerfile', '.sql',
         '.md', '.rst', '.txt', '.csv', '.gitignore', '.env', '.editorconfig'
-    }
+    })
     
     # File extensions to include content for (Python only)
     CONTENT_EXTENSIONS = {'.py'}
     
     # Directories to skip
-    SKIP_DIRS = {
+    SKIP_DIRS = frozenset({
         '.git', '.svn', '.hg', '__pycache__', 'node_modules', '.idea',
         '.vscode', '.vs', 'venv', 've', 'env', '.env', 'build', 'dist',
         'target', 'out', 'bin', 'obj', '.pytest_cache', '.mypy_cache',
         'coverage', '.coverage', 'htmlcov', '.tox', 'egg-info',
         '.DS_Store', 'Thumbs.db'
-    }
+    })
     
     # Binary file extensions to skip
-    BINARY_EXTENSIONS = {
+    BINARY_EXTENSIONS = frozenset({
         '.pyc', '.pyo', '.so', '.dll', '.dylib', '.exe', '.app',
         '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.ico', '.svg',
         '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx',
         '.zip', '.tar', '.gz', '.rar', '.7z', '.dmg', '.iso',
         '.mp3', '.mp4', '.avi', '.mov', '.wav', '.flac',
         '.ttf', '.otf', '.woff', '.woff2', '.eot'
-    }
+    })
+    
+    # Units for _format_size, one per power of 1024
+    _SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
     
     def __init__(self, root_path=None, output_file='project_documentation.txt'):
         """
@@ -61,20 +64,21 @@ class FileDocumenter:
         self.python_file_count = 0
         
     def should_include_in_tree(self, file_path):
-        """Check if file should be included in tree structure."""
-        file_path = Path(file_path)
+        """
+        Check if file should be included in tree structure.
         
-        # Skip if in skip directory
-        for parent in file_path.parents:
-            if parent.name in self.SKIP_DIRS:
-                return False
+        Directories in SKIP_DIRS are pruned by the traversals themselves,
+        so only the file's own name is checked here.
+        """
+        file_path = Path(file_path)
+        suffix = file_path.suffix.lower()
         
         # Skip binary files
-        if file_path.suffix.lower() in self.BINARY_EXTENSIONS:
+        if suffix in self.BINARY_EXTENSIONS:
             return False
         
         # Include if has code extension
-        if file_path.suffix.lower() in self.TREE_EXTENSIONS:
+        if suffix in self.TREE_EXTENSIONS:
             return True
         
         # Include if no extension but might be script (Dockerfile, Makefile, etc.)
@@ -89,43 +93,80 @@ class FileDocumenter:
         return file_path.suffix.lower() in self.CONTENT_EXTENSIONS
     
     def get_file_tree(self, start_path=None, prefix="", is_last=True):
-        """Generate visual file tree structure."""
+        """Generate visual file tree structure, one line at a time."""
+        for tree_line, _, _, _ in self._iter_files(start_path, prefix, is_last):
+            if tree_line is not None:
+                yield tree_line
+    
+    def _iter_files(self, start_path=None, prefix="", is_last=True, skip_path=None):
+        """
+        Walk the project once, yielding one entry per tree line and per
+        file whose content is included without it appearing in the tree.
+        
+        Args:
+            skip_path: Resolved path of a file to leave out, such as the
+                output file currently being written
+        
+        Yields:
+            (tree_line, rel_path, size, include_content) tuples; rel_path
+            and size are None for directory lines, tree_line is None for
+            content-only files
+        """
         if start_path is None:
             start_path = self.root_path
         
-        tree_lines = []
         start_path = Path(start_path)
         
         # Add current directory
         if start_path == self.root_path:
-            tree_lines.append(f"{start_path.name}/")
+            yield f"{start_path.name}/", None, None, False
         else:
             connector = "└── " if is_last else "├── "
-            tree_lines.append(f"{prefix}{connector}{start_path.name}/")
+            yield f"{prefix}{connector}{start_path.name}/", None, None, False
         
-        # Get all items in directory
+        # Get all items in directory; DirEntry caches the file type from
+        # the directory read, so filtering needs no extra stat calls
         try:
-            items = sorted(start_path.iterdir(), key=lambda x: (x.is_file(), x.name.lower()))
+            with os.scandir(start_path) as it:
+                items = sorted(it, key=lambda x: (x.is_file(), x.name.lower()))
         except PermissionError:
-            return tree_lines
+            return
         
         # Filter directories
         dirs = [item for item in items if item.is_dir() and item.name not in self.SKIP_DIRS]
-        files = [item for item in items if item.is_file() and self.should_include_in_tree(item)]
+        # Content is chosen separately from the tree, so keep files that
+        # only qualify for content too
+        files = []
+        for item in items:
+            if not item.is_file():
+                continue
+            if skip_path is not None and item.name == skip_path.name and Path(item.path).resolve() == skip_path:
+                continue
+            in_tree = self.should_include_in_tree(item.path)
+            if in_tree or self.should_include_content(item.name):
+                files.append((item, in_tree))
+        tree_file_count = sum(in_tree for _, in_tree in files)
         
         # Process directories
-        for i, dir_path in enumerate(dirs):
-            is_last_dir = (i == len(dirs) - 1) and len(files) == 0
+        for i, dir_entry in enumerate(dirs):
+            is_last_dir = (i == len(dirs) - 1) and tree_file_count == 0
             if start_path == self.root_path:
                 sub_prefix = ""
             else:
                 sub_prefix = prefix + ("    " if is_last else "│   ")
             
-            tree_lines.extend(self.get_file_tree(dir_path, sub_prefix, is_last_dir))
+            yield from self._iter_files(dir_entry.path, sub_prefix, is_last_dir, skip_path)
         
         # Process files
-        for i, file_path in enumerate(files):
-            is_last_file = i == len(files) - 1
+        tree_index = 0
+        for file_entry, in_tree in files:
+            rel_path = Path(file_entry.path).relative_to(self.root_path)
+            if not in_tree:
+                yield None, rel_path, file_entry.stat().st_size, True
+                continue
+            
+            tree_index += 1
+            is_last_file = tree_index == tree_file_count
             connector = "└── " if is_last_file else "├── "
             
             if start_path == self.root_path:
@@ -134,26 +175,46 @@ class FileDocumenter:
                 file_prefix = prefix + ("    " if is_last else "│   ") + connector
             
             # Add file size
-            size = file_path.stat().st_size
+            size = file_entry.stat().st_size
             size_str = self._format_size(size)
             
+            self.file_sizes[str(rel_path)] = size
+            
             # Mark Python files with an indicator
-            if self.should_include_content(file_path):
-                tree_lines.append(f"{file_prefix}{file_path.name} ({size_str}) *")
+            if self.should_include_content(file_entry.name):
+                yield f"{file_prefix}{file_entry.name} ({size_str}) *", rel_path, size, True
             else:
-                tree_lines.append(f"{file_prefix}{file_path.name} ({size_str})")
-            
-            self.file_sizes[str(file_path.relative_to(self.root_path))] = size
-        
-        return tree_lines
+                yield f"{file_prefix}{file_entry.name} ({size_str})", rel_path, size, False
     
     def _format_size(self, size):
         """Format file size in human-readable format."""
-        for unit in ['B', 'KB', 'MB', 'GB']:
-            if size < 1024.0:
-                return f"{size:.1f} {unit}"
-            size /= 1024.0
-        return f"{size:.1f} TB"
+        # Each unit step is 10 bits, so the unit follows from the bit length
+        k = min(max(int(size).bit_length() - 1, 0) // 10, 4)
+        return f"{size / (1 << (10 * k)):.1f} {self._SIZE_UNITS[k]}"
+    
+    def _count_lines(self, file_path):
+        """
+        Count lines in a file without decoding it, for the summary.
+        
+        Lines end at '\n', '\r\n' or a lone '\r' (universal newlines).
+        """
+        count = 0
+        last = b''
+        try:
+            with open(file_path, 'rb') as f:
+                for buf in iter(lambda: f.read(1 << 20), b''):
+                    count += buf.count(b'\n') + buf.count(b'\r') - buf.count(b'\r\n')
+                    # A '\r\n' split across two reads was counted twice
+                    if last == b'\r' and buf[:1] == b'\n':
+                        count -= 1
+                    last = buf[-1:]
+        except OSError:
+            return 0
+        
+        # A final line without a trailing newline still counts
+        if last and last not in (b'\n', b'\r'):
+            count += 1
+        return count
     
     def get_file_content(self, file_path):
         """Get content of a file with error handling."""
@@ -162,6 +223,16 @@ class FileDocumenter:
             with open(file_path, 'rb') as f:
                 raw_data = f.read()
             
+            # Most source files are plain ASCII and decode in a single pass
+            if raw_data.isascii():
+                return raw_data.decode('ascii')
+            
+            # Honour a byte order mark when present
+            if raw_data.startswith(b'\xef\xbb\xbf'):
+                return raw_data.decode('utf-8-sig', errors='replace')
+            if raw_data.startswith((b'\xff\xfe', b'\xfe\xff')):
+                return raw_data.decode('utf-16', errors='replace')
+            
             # Try common encodings
             for encoding in ['utf-8', 'latin-1', 'cp1252']:
                 try:
@@ -176,84 +247,78 @@ class FileDocumenter:
     
     def document_project(self):
         """Generate complete project documentation."""
-        output_lines = []
-        
-        # Header
-        output_lines.append("=" * 80)
-        output_lines.append("PROJECT DOCUMENTATION")
-        output_lines.append("=" * 80)
-        output_lines.append(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        output_lines.append(f"Root Directory: {self.root_path.absolute()}")
-        output_lines.append("=" * 80)
-        output_lines.append("")
-        
-        # File tree
-        output_lines.append("FILE STRUCTURE:")
-        output_lines.append("-" * 40)
-        output_lines.append("(* indicates Python files with content included)")
-        output_lines.append("")
-        tree_lines = self.get_file_tree()
-        output_lines.extend(tree_lines)
-        output_lines.append("")
-        
-        # File contents (Python files only)
-        output_lines.append("=" * 80)
-        output_lines.append("PYTHON FILE CONTENTS:")
-        output_lines.append("=" * 80)
-        output_lines.append("")
-        
-        # Walk through all files
-        for root, dirs, files in os.walk(self.root_path):
-            # Skip unwanted directories
-            dirs[:] = [d for d in dirs if d not in self.SKIP_DIRS]
-            
-            root_path = Path(root)
+        # Stream straight into a large write buffer instead of collecting
+        # every output line in memory first
+        with open(self.output_file, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            # Header
+            f.write("=" * 80 + "\n")
+            f.write("PROJECT DOCUMENTATION\n")
+            f.write("=" * 80 + "\n")
+            f.write(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write(f"Root Directory: {self.root_path.absolute()}\n")
+            f.write("=" * 80 + "\n")
+            f.write("\n")
             
-            for file_name in sorted(files):
-                file_path = root_path / file_name
-                
-                # Count all files in tree
-                if self.should_include_in_tree(file_path):
-                    self.file_count += 1
-                
-                # Only include content for Python files
-                if not self.should_include_content(file_path):
-                    continue
+            # File tree
+            f.write("FILE STRUCTURE:\n")
+            f.write("-" * 40 + "\n")
+            f.write("(* indicates Python files with content included)\n")
+            f.write("\n")
+            # One traversal feeds both the tree and the content section
+            content_files = []
+            # The output file is already open (and empty), so keep it out
+            output_path = Path(self.output_file).resolve()
+            for tree_line, rel_path, size, include_content in self._iter_files(skip_path=output_path):
+                if tree_line is not None:
+                    f.write(tree_line + "\n")
+                    
+                    # Count all files in tree
+                    if rel_path is not None:
+                        self.file_count += 1
                 
+                # Only include content for Python files, in the tree or not
+                if include_content:
+                    content_files.append((rel_path, size))
+            f.write("\n")
+            
+            # File contents (Python files only)
+            f.write("=" * 80 + "\n")
+            f.write("PYTHON FILE CONTENTS:\n")
+            f.write("=" * 80 + "\n")
+            f.write("\n")
+            
+            for rel_path, size in content_files:
                 self.python_file_count += 1
-                rel_path = file_path.relative_to(self.root_path)
                 
                 # File header
-                output_lines.append("-" * 80)
-                output_lines.append(f"FILE: {rel_path}")
-                output_lines.append(f"SIZE: {self._format_size(self.file_sizes.get(str(rel_path), 0))}")
-                output_lines.append("-" * 80)
+                f.write("-" * 80 + "\n")
+                f.write(f"FILE: {rel_path}\n")
+                f.write(f"SIZE: {self._format_size(size)}\n")
+                f.write("-" * 80 + "\n")
                 
                 # File content
+                file_path = self.root_path / rel_path
                 content = self.get_file_content(file_path)
                 lines = content.splitlines()
                 self.total_lines += len(lines)
                 
-                # Add line numbers
-                for i, line in enumerate(lines, 1):
-                    output_lines.append(f"{i:4d} | {line}")
+                # Add line numbers, writing the whole file in one call
+                if lines:
+                    f.write("\n".join([f"{i:4d} | {line}" for i, line in enumerate(lines, 1)]))
+                    f.write("\n")
                 
-                output_lines.append("")
-        
-        # Summary
-        output_lines.append("=" * 80)
-        output_lines.append("SUMMARY:")
-        output_lines.append("-" * 40)
-        output_lines.append(f"Total Files in Tree: {self.file_count}")
-        output_lines.append(f"Python Files with Content: {self.python_file_count}")
-        output_lines.append(f"Total Python Lines: {self.total_lines:,}")
-        total_size = sum(self.file_sizes.values())
-        output_lines.append(f"Total Project Size: {self._format_size(total_size)}")
-        output_lines.append("=" * 80)
-        
-        # Write to file
-        with open(self.output_file, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(output_lines))
+                f.write("\n")
+            
+            # Summary
+            f.write("=" * 80 + "\n")
+            f.write("SUMMARY:\n")
+            f.write("-" * 40 + "\n")
+            f.write(f"Total Files in Tree: {self.file_count}\n")
+            f.write(f"Python Files with Content: {self.python_file_count}\n")
+            f.write(f"Total Python Lines: {self.total_lines:,}\n")
+            total_size = sum(self.file_sizes.values())
+            f.write(f"Total Project Size: {self._format_size(total_size)}\n")
+            f.write("=" * 80)
         
         print(f"\nDocumentation generated: {self.output_file}")
         print(f"Total files in tree: {self.file_count}")
@@ -280,34 +345,28 @@ class FileDocumenter:
         output_lines.append("-" * 40)
         output_lines.append("(* indicates Python files)")
         output_lines.append("")
-        tree_lines = self.get_file_tree()
-        output_lines.extend(tree_lines)
+        output_lines.extend(self.get_file_tree())
         output_lines.append("")
         
-        # Statistics by file type
+        # Statistics by file type, reusing the sizes recorded while
+        # building the tree rather than walking and stat-ing again
         file_stats = {}
         python_stats = {'count': 0, 'size': 0, 'lines': 0}
         
-        for root, dirs, files in os.walk(self.root_path):
-            dirs[:] = [d for d in dirs if d not in self.SKIP_DIRS]
-            root_path = Path(root)
+        for rel_path, size in self.file_sizes.items():
+            file_path = self.root_path / rel_path
+            ext = file_path.suffix.lower() or 'no extension'
+            if ext not in file_stats:
+                file_stats[ext] = {'count': 0, 'size': 0}
+            file_stats[ext]['count'] += 1
+            file_stats[ext]['size'] += size
             
-            for file_name in files:
-                file_path = root_path / file_name
-                if self.should_include_in_tree(file_path):
-                    ext = file_path.suffix.lower() or 'no extension'
-                    if ext not in file_stats:
-                        file_stats[ext] = {'count': 0, 'size': 0}
-                    file_stats[ext]['count'] += 1
-                    file_stats[ext]['size'] += file_path.stat().st_size
-                    
-                    # Track Python files separately
-                    if ext == '.py':
-                        python_stats['count'] += 1
-                        python_stats['size'] += file_path.stat().st_size
-                        # Count lines in Python files
-                        content = self.get_file_content(file_path)
-                        python_stats['lines'] += len(content.splitlines())
+            # Track Python files separately
+            if ext == '.py':
+                python_stats['count'] += 1
+                python_stats['size'] += size
+                # Count lines in Python files
+                python_stats['lines'] += self._count_lines(file_path)
         
         # Summary statistics
         output_lines.append("=" * 80)
@@ -364,10 +423,9 @@ def main():
     
     # Remove extensions from tree
     if args.exclude_tree:
-        for ext in args.exclude_tree:
-            if not ext.startswith('.'):
-                ext = '.' + ext
-            documenter.TREE_EXTENSIONS.discard(ext.lower())
+        excluded = {ext.lower() if ext.startswith('.') else '.' + ext.lower()
+                    for ext in args.exclude_tree}
+        documenter.TREE_EXTENSIONS = documenter.TREE_EXTENSIONS - excluded
     
     # Generate documentation
     if args.summary:
@@ -4,14 +4,56 @@ Creates cochlea model with full circle cross sections only
 """
 
 import argparse
+import io
+import multiprocessing
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from cochlea_model import CochleaModel
-from cochlea_visualization import CochleaVisualizer
 from cochlea_export import CochleaExporter
 
 
+# matplotlib.pyplot, imported on first use so the backend can be chosen first
+_plt = None
+
+
+def _pyplot():
+    """Return matplotlib.pyplot, importing it only once."""
+    global _plt
+    if _plt is None:
+        import matplotlib.pyplot as plt
+        _plt = plt
+    return _plt
+
+
+def _render_figure(fig, fmt, dpi):
+    """Render a figure to image bytes of the given format in memory."""
+    buf = io.BytesIO()
+    # The visualizer lays figures out with constrained layout, so
+    # bbox_inches='tight' would only add a second full render pass
+    fig.savefig(buf, format=fmt, dpi=dpi)
+    return buf.getvalue()
+
+
+def _save_figures(figures, plot_dir, dpi=150):
+    """
+    Save figures into plot_dir, one after another on the calling thread.
+    
+    matplotlib is not thread-safe, and unless running headless the same
+    figures are live in GUI windows, so they are not rendered concurrently.
+    
+    Args:
+        figures: Iterable of (figure, filename) pairs; the file extension
+            selects the format
+        plot_dir: Target directory (must exist)
+        dpi: Output resolution
+    """
+    for fig, name in figures:
+        (plot_dir / name).write_bytes(_render_figure(fig, Path(name).suffix[1:], dpi))
+
+
 def main():
     """Main function to run cochlea model generation."""
     
@@ -26,9 +68,17 @@ def main():
     parser.add_argument('--no-plot', action='store_true',
                       help='Skip visualization plots')
     parser.add_argument('--save-plots', action='store_true',
-                      help='Save plots as PNG files')
+                      help='Save plots as SVG/PNG files')
     parser.add_argument('--keep-existing', action='store_true',
                       help='Keep existing files instead of replacing them')
+    parser.add_argument('--force-plot', action='store_true',
+                      help='Build plots even when output is not a terminal')
+    parser.add_argument('--headless', action='store_true',
+                      help='Render with the Agg backend and do not show plot windows')
+    parser.add_argument('--centerline-mode', choices=['3D', '2D'],
+                      help='Centerline export mode (asked interactively if omitted)')
+    parser.add_argument('--cross-sections', type=int, metavar='N',
+                      help='Number of cross sections, 2-20 (asked interactively if omitted)')
     
     args = parser.parse_args()
     
@@ -37,6 +87,29 @@ def main():
         parser.error("--mode custom requires --parameters")
     if args.mode != 'custom' and args.parameters is not None:
         parser.error("--parameters can only be used with --mode custom")
+    # Checked here, as the export worker would only fail after the plots
+    if args.cross_sections is not None and not 2 <= args.cross_sections <= 20:
+        parser.error("--cross-sections must be between 2 and 20")
+    
+    # Plots that are neither saved nor seen by anyone are not worth building
+    if (not args.no_plot and not args.save_plots and not args.force_plot
+            and not sys.stdout.isatty()):
+        print("Output is not a terminal; skipping plots (use --force-plot to override)")
+        args.no_plot = True
+    
+    # Headless plots are never shown, so without --save-plots they go nowhere
+    if args.headless and not args.save_plots and not args.no_plot:
+        print("--headless without --save-plots; skipping plots")
+        args.no_plot = True
+    
+    # Saving plots without a display needs no GUI backend at all
+    no_display = (sys.platform.startswith('linux') and not os.environ.get('DISPLAY')
+                  and not os.environ.get('WAYLAND_DISPLAY'))
+    headless = args.headless or (args.save_plots and no_display)
+    if headless and not args.no_plot:
+        # Must happen before pyplot is first imported
+        import matplotlib
+        matplotlib.use('Agg')
     
     print("="*60)
     print("COCHLEA MODEL GENERATOR - SIMPLIFIED VERSION")
@@ -49,40 +122,85 @@ def main():
         else:
             model = CochleaModel(mode=args.mode)
         
-        # Visualization
-        if not args.no_plot:
-            print("\nGenerating visualizations...")
-            visualizer = CochleaVisualizer(model)
-            
-            # Create plots
-            fig1 = visualizer.plot_parameters()
-            fig2, ax = visualizer.plot_3d_model()
-            fig3 = visualizer.plot_cross_sections()
+        # Plotting and the %.6f CSV output both work fine in single precision
+        model.to_float32_contiguous()
+        
+        # Ask for export options up front so the export can run unattended
+        exporter = CochleaExporter(model)
+        centerline_mode = args.centerline_mode
+        num_cross_sections = args.cross_sections
+        if centerline_mode is None and num_cross_sections is None and sys.stdin.isatty():
+            centerline_mode, num_cross_sections = exporter.prompt_export_options()
+        
+        # Use replace_existing based on --keep-existing flag
+        export_kwargs = {
+            'replace_existing': not args.keep_existing,
+            'centerline_mode': centerline_mode,
+            'num_cross_sections': num_cross_sections,
+            'parallel': True
+        }
+        
+        if args.no_plot:
+            # Export files
+            print("\nExporting files...")
+            results = exporter.export_all(args.export_dir, **export_kwargs)
+        else:
+            # Export on a worker thread while the figures are built here
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                print("\nExporting files...")
+                export_future = pool.submit(exporter.export_all, args.export_dir,
+                                            **export_kwargs)
+                
+                print("\nGenerating visualizations...")
+                # Imported here so --no-plot runs never load matplotlib
+                from cochlea_visualization import CochleaVisualizer
+                visualizer = CochleaVisualizer(model)
+                
+                # Create plots
+                fig1 = visualizer.plot_parameters()
+                fig2, ax = visualizer.plot_3d_model()
+                fig3 = visualizer.plot_cross_sections()
+                
+                # Put the windows up now so they can be viewed while the
+                # export is still running; pausing keeps the GUI event loop
+                # turning so they do not freeze until the export ends
+                if not headless:
+                    _pyplot().show(block=False)
+                    while not export_future.done():
+                        _pyplot().pause(0.05)
+                
+                # The export may replace the export directory, so it has
+                # to finish before plots are written into it
+                results = export_future.result()
             
             if args.save_plots:
-                plot_dir = Path(args.export_dir) / 'plots'
+                plot_dir = Path(args.export_dir, 'plots')
                 plot_dir.mkdir(parents=True, exist_ok=True)
                 
-                fig1.savefig(plot_dir / 'parameters.png', dpi=150, bbox_inches='tight')
-                fig2.savefig(plot_dir / '3d_model.png', dpi=150, bbox_inches='tight')
-                fig3.savefig(plot_dir / 'cross_sections.png', dpi=150, bbox_inches='tight')
+                # Line plots go out as vector SVG; only the shaded 3D
+                # surface needs rasterizing
+                _save_figures([(fig1, 'parameters.svg'),
+                               (fig2, '3d_model.png'),
+                               (fig3, 'cross_sections.svg')], plot_dir)
                 print(f"Plots saved to {plot_dir}")
+                
+                # Nothing else will use the figures in a headless run
+                if headless:
+                    for fig in (fig1, fig2, fig3):
+                        _pyplot().close(fig)
             
-            # Show plots
-            import matplotlib.pyplot as plt
-            plt.show()
-        
-        # Export files
-        print("\nExporting files...")
-        exporter = CochleaExporter(model)
-        # Use replace_existing based on --keep-existing flag
-        results = exporter.export_all(args.export_dir, replace_existing=not args.keep_existing)
+            # Keep the plot windows open until the user closes them
+            if not headless:
+                _pyplot().show()
         
         # Print lengths
-        print(f"\nModel Statistics:")
-        print(f"  Number of turns: {model.n_turns:.2f}")
-        print(f"  Length with height: {model.calculate_length(True):.2f} mm")
-        print(f"  Length without height: {model.calculate_length(False):.2f} mm")
+        length_with_height, length_without_height = model.calculate_lengths()
+        sys.stdout.write(
+            f"\nModel Statistics:\n"
+            f"  Number of turns: {model.n_turns:.2f}\n"
+            f"  Length with height: {length_with_height:.2f} mm\n"
+            f"  Length without height: {length_without_height:.2f} mm\n"
+        )
         
         print("\nProcess completed successfully!")
         
@@ -93,7 +211,8 @@ def main():
     return 0
 
 
-def quick_generate(parameters=None, mode='mean', export_dir='cochlea_output', replace_existing=True):
+def quick_generate(parameters=None, mode='mean', export_dir='cochlea_output', replace_existing=True,
+                   plot=None, show=False, close_after=None):
     """
     Quick generation function for script usage.
     
@@ -102,30 +221,93 @@ def quick_generate(parameters=None, mode='mean', export_dir='cochlea_output', re
         mode: 'mean' or 'random' if parameters is None
         export_dir: Output directory
         replace_existing: If True, replace existing files
+        plot: Build the 3D plot; defaults to show, so a plain call never
+            imports matplotlib
+        show: If True, open the plot window and block until it is closed
+        close_after: Close the plot figure before returning; defaults to
+            show, so a plot built without showing stays open (e.g. for
+            inline display in Jupyter)
     
     Example:
         from main import quick_generate
         quick_generate(mode='random')
         # or to keep existing files:
         quick_generate(mode='mean', replace_existing=False)
+        # returns without blocking or plotting; to view the 3D plot:
+        quick_generate(mode='mean', show=True)
+        # or, in a notebook, leave the figure open for inline display:
+        quick_generate(mode='mean', plot=True)
     """
+    if plot is None:
+        plot = show
+    if close_after is None:
+        close_after = show
+    
     # Create model
     model = CochleaModel(parameters=parameters, mode=mode)
     
     # Visualize
-    visualizer = CochleaVisualizer(model)
-    visualizer.plot_3d_model()
+    if plot:
+        from cochlea_visualization import CochleaVisualizer
+        visualizer = CochleaVisualizer(model)
+        fig, ax = visualizer.plot_3d_model()
     
     # Export
     exporter = CochleaExporter(model)
     exporter.export_all(export_dir, replace_existing)
     
     # Show plots
-    import matplotlib.pyplot as plt
-    plt.show()
+    if plot and show:
+        _pyplot().show()
+    
+    # Release the figure's canvas memory, e.g. when called in a loop
+    if plot and close_after:
+        _pyplot().close(fig)
     
     return model
 
 
+def _export_job(job):
+    """Build and export one model inside a batch worker process."""
+    parameters, export_dir, centerline_mode, num_cross_sections = job
+    model = CochleaModel(parameters=parameters)
+    CochleaExporter(model).export_all(export_dir, replace_existing=True,
+                                      centerline_mode=centerline_mode,
+                                      num_cross_sections=num_cross_sections)
+    return export_dir
+
+
+def batch_generate(parameter_sets, export_root='cochlea_batch', centerline_mode='3D',
+                   num_cross_sections=5, processes=None):
+    """
+    Export many parameter sets in parallel worker processes.
+    
+    Workers are forked on Linux, so they inherit the already imported
+    modules instead of re-importing them; other platforms use spawn.
+    
+    Args:
+        parameter_sets: Iterable of [A1, B1, A2, B2] parameter lists
+        export_root: Parent directory; set i is written to 'cochlea_<i>'
+        centerline_mode: '3D' or '2D'
+        num_cross_sections: Number of cross sections (2-20)
+        processes: Worker count (default: CPU count)
+    
+    Returns:
+        list of export directories, in input order
+    
+    Example:
+        from main import batch_generate
+        batch_generate([[5.97, 3.95, 3.26, 2.85], [6.2, 4.1, 3.4, 2.9]])
+    """
+    jobs = [(list(parameters), str(Path(export_root, f'cochlea_{i:03d}')),
+             centerline_mode, num_cross_sections)
+            for i, parameters in enumerate(parameter_sets)]
+    Path(export_root).mkdir(parents=True, exist_ok=True)
+    
+    method = 'fork' if sys.platform.startswith('linux') else 'spawn'
+    with multiprocessing.get_context(method).Pool(processes) as pool:
+        return pool.map(_export_job, jobs)
+
+
 if __name__ == "__main__":
     sys.exit(main())
\ No newline at end of file